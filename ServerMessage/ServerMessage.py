@@ -1,11 +1,11 @@
 # ./ServerMessage/ServerMessage.py
 
 import streamlit as st
-import requests
 from datetime import datetime
 import os
 from enum import Enum
 from pathlib import Path
+from .tabs.chat_tab import get_http_session
 
 # Enum for instruction types
 class InstructionType(Enum):
@@ -128,11 +128,11 @@ def send_to_server(instruction_content: str, message_content: str):
     }
     
     try:
-        response = requests.post(
+        response = get_http_session().post(
             URL,
             headers={"Content-Type": "application/json"},
             json=request_data,
-            verify=False
+            timeout=30
         )
         
         if response.status_code == 200:
@@ -2,34 +2,63 @@
 
 import streamlit as st
 import os
-import json
-from tabs.chat_tab import render_chat_tab
-from tabs.history_tab import render_history_tab
-from tabs.git_tab import render_git_tab
-from tabs.npc_summary_tab import render_npc_summary_tab
-from tabs.player_summary_tab import render_player_summary_tab
-from tabs.combat_tab import render_combat_tab
-from tabs.debug_tab import render_debug_tab
+import orjson
+from itertools import accumulate
+from tabs import (
+    render_chat_tab,
+    render_history_tab,
+    render_git_tab,
+    render_npc_summary_tab,
+    render_player_summary_tab,
+    render_combat_tab,
+    render_debug_tab
+)
+from tabs.chat_tab import prewarm_connection, CHAT_HISTORY_FILE
+
+# Default session state values
+_DEFAULTS = (
+    ("git_output", None),
+    ("show_git_results", False),
+    ("context_length", 2048),
+    ("temperature", 0.7),
+    ("max_tokens", 200),
+    ("model_context_tokens", 4096),
+    ("compress_requests", False),
+    ("server_ip", "127.0.0.1"),
+    ("server_port", "5000"),
+)
 
 # Initialize session states and load settings
-if 'git_output' not in st.session_state:
-    st.session_state.git_output = None
-if 'show_git_results' not in st.session_state:
-    st.session_state.show_git_results = False
-if 'context_length' not in st.session_state:
-    st.session_state.context_length = 2048
-if 'temperature' not in st.session_state:
-    st.session_state.temperature = 0.7
-if 'max_tokens' not in st.session_state:
-    st.session_state.max_tokens = 200
+for key, default in _DEFAULTS:
+    st.session_state.setdefault(key, default)
 
-# Load chat history from local storage
-if 'chat_history' not in st.session_state:
+# Load chat history from local storage into parallel role/content lists
+if 'chat_history_contents' not in st.session_state:
     try:
-        with open('chat_history.json', 'r') as f:
-            st.session_state.chat_history = json.load(f)
+        with open(CHAT_HISTORY_FILE, 'rb') as f:
+            chat_history = [orjson.loads(line) for line in f if line.strip()]
     except FileNotFoundError:
-        st.session_state.chat_history = []
+        # Fall back to the legacy single-document history file
+        try:
+            with open('chat_history.json', 'rb') as f:
+                chat_history = orjson.loads(f.read())
+        except FileNotFoundError:
+            chat_history = []
+        if chat_history:
+            # Migrate once so later appends extend the full history
+            with open(CHAT_HISTORY_FILE, 'wb') as f:
+                f.writelines(orjson.dumps(msg) + b"\n" for msg in chat_history)
+    st.session_state.chat_history_roles = ["user" if msg["is_user"] else "assistant" for msg in chat_history]
+    st.session_state.chat_history_contents = [msg["content"] for msg in chat_history]
+    # Wire-ready copies, so sends slice the history instead of rebuilding message dicts
+    st.session_state.chat_history_messages = [
+        {"role": role, "content": content}
+        for role, content in zip(st.session_state.chat_history_roles, st.session_state.chat_history_contents)
+    ]
+    # Running message lengths, so the context window cutoff can be found by bisection
+    st.session_state.chat_history_offsets = list(
+        accumulate(map(len, st.session_state.chat_history_contents), initial=0)
+    )
 
 # Determine the directory of this script (./ServerMessage)
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -41,11 +70,6 @@ st.title("Oobabooga API Client (ServerMessage)")
 # --- Configure API endpoint ---
 with st.sidebar:
     st.header("Server Configuration")
-    if 'server_ip' not in st.session_state:
-        st.session_state.server_ip = "127.0.0.1"
-    if 'server_port' not in st.session_state:
-        st.session_state.server_port = "5000"
-        
     st.session_state.server_ip = st.text_input("Oobabooga Server IP", 
                                               value=st.session_state.server_ip, 
                                               key="server_ip_input")
@@ -54,6 +78,8 @@ with st.sidebar:
                                                 key="server_port_input")
     base_url = f"http://{st.session_state.server_ip}:{st.session_state.server_port}/v1"
     st.write("Using API Base URL:", base_url)
+    st.checkbox("Debug mode", key="debug_mode", help="Show payloads, responses and tracebacks")
+    prewarm_connection(base_url)
 
 # Create tabs for different functionalities
 chat_tab, params_tab, history_tab, char_tab, combat_tab, debug_tab, git_tab = st.tabs([
@@ -74,11 +100,12 @@ with params_tab:
     st.header("Model Parameters")
     temperature = st.slider(
         "Temperature",
-        min_value=0.1,
+        min_value=0.0,
         max_value=2.0,
         value=0.7,
         step=0.1,
-        key="temp_slider_params"
+        key="temp_slider_params",
+        help="At 0.3 or below, repeated identical sends are served from cache instead of streamed"
     )
     max_tokens = st.number_input(
         "Max Tokens",
@@ -94,9 +121,23 @@ with params_tab:
         value=2048,
         key="context_length_input_params"
     )
+    model_context_tokens = st.number_input(
+        "Model Context Window (tokens)",
+        min_value=256,
+        max_value=131072,
+        value=4096,
+        key="model_context_tokens_input_params",
+        help="Prompts estimated to exceed this, including Max Tokens, are trimmed before sending"
+    )
     st.session_state.temperature = temperature
     st.session_state.max_tokens = max_tokens
     st.session_state.context_length = context_length
+    st.session_state.model_context_tokens = model_context_tokens
+    st.checkbox(
+        "Compress request bodies (gzip)",
+        key="compress_requests",
+        help="Only for servers that accept Content-Encoding: gzip; turned off for the session if refused"
+    )
 
 with history_tab:
     render_history_tab()
@@ -112,7 +153,7 @@ with char_tab:
         render_player_summary_tab()
 
 with combat_tab:
-    render_combat_tab()
+    render_combat_tab(base_url)
 
 with debug_tab:
     render_debug_tab()
@@ -2,8 +2,142 @@
 
 import streamlit as st
 import requests
-import json
-from typing import Dict, Any
+import orjson
+import gzip
+import traceback
+import threading
+import time
+from bisect import bisect_left
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, Tuple
+
+# Sends at or below this temperature are near-deterministic and may be answered from cache
+CACHE_MAX_TEMPERATURE = 0.3
+
+# Only the most recent messages are sent verbatim; older ones are folded into a summary
+HISTORY_WINDOW = 12
+SUMMARY_INTERVAL = 6
+SUMMARY_MAX_TOKENS = 150
+
+# Background connection probes run at most once per this many seconds
+SERVER_PROBE_TTL = 30
+
+# Tracebacks shown in the UI are capped so deep Streamlit stacks stay readable
+TRACEBACK_LIMIT = 15
+
+# Request bodies are gzip-compressed only when enabled in the parameters tab; a server that
+# answers 415, or a 400 naming the content encoding, gets plain JSON for the rest of the session
+GZIP_UNSUPPORTED_STATUS = 415
+
+# Streamed tokens are flushed to the page in batches of this many deltas
+STREAM_FLUSH_EVERY = 6
+
+# Movement states offered for both combatants
+_STATUS_OPTS = ("standing", "prone", "flying", "swimming")
+
+# Chat history is persisted as JSON Lines so each turn only appends its new entries
+CHAT_HISTORY_FILE = "chat_history.jsonl"
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Return a pooled keep-alive session shared across reruns"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        # Back off on rate limits and transient server errors; the final response is
+        # returned (not raised) so its Retry-After can be shown to the user. Connection
+        # and read failures are not retried so an unreachable server is reported at once
+        max_retries=Retry(
+            total=5,
+            connect=0,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def prewarm_connection(base_url: str) -> None:
+    """Keep a connection open in the background so sends skip the handshake"""
+    now = time.monotonic()
+    if (st.session_state.get('prewarmed_base_url') == base_url
+            and now - st.session_state.get('server_probe_ts', 0.0) < SERVER_PROBE_TTL):
+        return
+    st.session_state.prewarmed_base_url = base_url
+    st.session_state.server_probe_ts = now
+    session = get_http_session()
+
+    def _probe() -> None:
+        try:
+            session.get(f"{base_url}/models", timeout=2)
+        except requests.exceptions.RequestException:
+            pass  # Connection problems are reported on the first send
+
+    # Run off the script thread so an unreachable server cannot stall the page
+    threading.Thread(target=_probe, daemon=True).start()
+
+@st.cache_resource
+def get_token_encoder():
+    """
+    Load the tokenizer used to estimate prompt size
+
+    Returns None when tiktoken is missing or cannot fetch its BPE file (offline setups);
+    the None is cached so the download is not retried on every send.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def complete_many(base_url: str, payloads: List[Dict[str, Any]]) -> List[str]:
+    """Run several completions concurrently over the shared session, returning replies in order"""
+    if not payloads:
+        return []
+    session = get_http_session()
+
+    def _complete(payload: Dict[str, Any]) -> str:
+        response = session.post(
+            f"{base_url}/chat/completions",
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=30
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)['choices'][0]['message']['content']
+
+    # The session pool holds up to 8 connections, so cap in-flight requests to match
+    with ThreadPoolExecutor(max_workers=min(len(payloads), 8)) as executor:
+        return list(executor.map(_complete, payloads))
+
+def compose_history_markdown() -> str:
+    """Pre-compose the conversation as one markdown block, recomputed only when it changes"""
+    contents = st.session_state.chat_history_contents
+    # History only grows by appending or is replaced wholesale, so this fingerprint tracks changes
+    fingerprint = (id(contents), len(contents), id(contents[-1]) if contents else 0)
+    cached = st.session_state.get('history_markdown_cache')
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    markdown = "\n\n---\n\n".join(
+        f"**{role.capitalize()}:** {_close_code_fence(content)}"
+        for role, content in zip(st.session_state.chat_history_roles, contents)
+    )
+    st.session_state.history_markdown_cache = (fingerprint, markdown)
+    return markdown
+
+def _close_code_fence(content: str) -> str:
+    """Close a code fence left open (e.g. by a reply cut off at max_tokens) so it cannot swallow later turns"""
+    fences = sum(1 for line in content.splitlines() if line.lstrip().startswith("```"))
+    return f"{content}\n```" if fences % 2 else content
 
 def render_chat_tab(base_url: str):
     """Handle the chat interface tab functionality"""
@@ -19,77 +153,49 @@ def render_chat_tab(base_url: str):
 
     # Character Status Display
     col1, col2, col3 = st.columns(3)
+    # Widget keys hold these values; readers use pc_status_select, distance_input and npc_status_select
     with col1:
         st.subheader("Player Character")
-        if 'pc_status' not in st.session_state:
-            st.session_state.pc_status = "standing"
-        pc_status = st.selectbox(
-            "Status",
-            ["standing", "prone", "flying", "swimming"],
-            key="pc_status_select",
-            index=["standing", "prone", "flying", "swimming"].index(st.session_state.pc_status)
-        )
-        st.session_state.pc_status = pc_status
+        st.selectbox("Status", _STATUS_OPTS, key="pc_status_select")
 
     with col2:
         st.subheader("Distance")
-        if 'char_distance' not in st.session_state:
-            st.session_state.char_distance = 30
-        distance = st.number_input(
-            "Feet",
-            min_value=0,
-            value=st.session_state.char_distance,
-            key="distance_input"
-        )
-        st.session_state.char_distance = distance
+        st.number_input("Feet", min_value=0, value=30, key="distance_input")
 
     with col3:
         st.subheader("NPC")
-        if 'npc_status' not in st.session_state:
-            st.session_state.npc_status = "standing"
-        npc_status = st.selectbox(
-            "Status",
-            ["standing", "prone", "flying", "swimming"],
-            key="npc_status_select",
-            index=["standing", "prone", "flying", "swimming"].index(st.session_state.npc_status)
-        )
-        st.session_state.npc_status = npc_status
+        st.selectbox("Status", _STATUS_OPTS, key="npc_status_select")
 
     # Display full chat history for reference
     st.subheader("Conversation History")
-    for msg in st.session_state.chat_history:
-        with st.container():
-            if msg["is_user"]:
-                st.markdown("**User:**")
-            else:
-                st.markdown("**Assistant:**")
-            st.write(msg["content"])
-            st.divider()
+    if st.session_state.chat_history_contents:
+        st.markdown(compose_history_markdown())
+    st.session_state.history_rendered_len = len(st.session_state.chat_history_contents)
 
     # Display combined chat history for context tracking
     if mode == "Chat":
         st.subheader("Combined Context")
-        combined_chat = ""
-        total_length = 0
-        
-        for msg in reversed(st.session_state.chat_history):
-            msg_length = len(msg["content"])
-            if total_length + msg_length > st.session_state.context_length:
-                break
-                
-            role = "User" if msg["is_user"] else "Assistant"
-            new_content = f"{role}: {msg['content']}\n\n"
-            combined_chat = new_content + combined_chat
-            total_length += msg_length
-            
         st.text_area(
             "Current Context Window",
-            value=combined_chat,
+            value=_get_combined_context(),
             height=200,
             key="context_window",
             disabled=True
         )
 
+    _message_composer(base_url, mode)
+
+@st.fragment
+def _message_composer(base_url: str, mode: str) -> None:
+    """Message inputs and send flow, rerun on their own instead of with the whole app"""
+    # Turns sent since the last full run are not in the history above yet
+    roles = st.session_state.chat_history_roles
+    contents = st.session_state.chat_history_contents
+    for role, content in zip(roles[st.session_state.history_rendered_len:],
+                             contents[st.session_state.history_rendered_len:]):
+        with st.chat_message(role):
+            st.markdown(content)
+
     # Input fields
     st.subheader("New Message")
     instructions = st.text_area(
@@ -99,14 +205,6 @@ def render_chat_tab(base_url: str):
         key="sys_instructions"
     )
 
-    server_message = st.text_area(
-        "Message Content", 
-        value="Hello!",
-        help="The main message to send to the model",
-        height=150,
-        key="message_content"
-    )
-
     termination = st.text_area(
         "Termination Instructions",
         help="Specify conditions or instructions for ending the response",
@@ -114,7 +212,18 @@ def render_chat_tab(base_url: str):
         key="termination_instructions"
     )
 
-    if st.button("Send Message", key="send_msg_btn"):
+    # The form submits once per send, so a turn costs a single fragment run
+    with st.form("send_form", clear_on_submit=True):
+        server_message = st.text_area(
+            "Message Content", 
+            value="Hello!",
+            help="The main message to send to the model",
+            height=150,
+            key="message_content"
+        )
+        submitted = st.form_submit_button("Send Message")
+
+    if submitted:
         _handle_message_submission(
             base_url=base_url,
             instructions=instructions,
@@ -123,6 +232,33 @@ def render_chat_tab(base_url: str):
             mode=mode
         )
 
+def _context_start() -> int:
+    """Index of the oldest message inside both the history window and the context budget"""
+    offsets = st.session_state.chat_history_offsets
+    # offsets[i] is the total length of the first i messages, so the tail starting at i
+    # fits the budget when offsets[-1] - offsets[i] <= context_length
+    budget_start = bisect_left(offsets, offsets[-1] - st.session_state.context_length)
+    return max(budget_start, len(offsets) - 1 - HISTORY_WINDOW)
+
+def _context_messages() -> List[Dict[str, str]]:
+    """Return the wire-ready messages inside the context window"""
+    return st.session_state.chat_history_messages[_context_start():]
+
+def _get_combined_context() -> str:
+    """Build the context window preview, reusing the last result until history or budget changes"""
+    contents = st.session_state.chat_history_contents
+    # History only grows by appending or is replaced wholesale, so identity plus length tracks changes
+    cache_key = (id(contents), len(contents), st.session_state.context_length)
+    cached = st.session_state.get('combined_context_cache')
+    if cached and cached[0] == cache_key:
+        return cached[1]
+
+    combined_chat = "".join(
+        f"{msg['role'].capitalize()}: {msg['content']}\n\n" for msg in _context_messages()
+    )
+    st.session_state.combined_context_cache = (cache_key, combined_chat)
+    return combined_chat
+
 def _handle_message_submission(
     base_url: str,
     instructions: str,
@@ -142,16 +278,14 @@ def _handle_message_submission(
     
     # Add chat history based on context length
     if mode == "Chat":
-        total_length = 0
-        for msg in reversed(st.session_state.chat_history):
-            msg_length = len(msg["content"])
-            if total_length + msg_length > st.session_state.context_length:
-                break
-            messages.insert(0, {
-                "role": "user" if msg["is_user"] else "assistant",
-                "content": msg["content"]
+        summary = _get_history_summary(base_url)
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {summary}"
             })
-            total_length += msg_length
+
+        messages.extend(_context_messages())
     
     # Add the current message
     messages.append({
@@ -159,6 +293,11 @@ def _handle_message_submission(
         "content": server_message
     })
 
+    # Reject prompts that cannot fit before paying a round trip to learn it
+    if not _fit_to_context_window(messages, st.session_state.max_tokens):
+        st.error("The message is too long for the model context window. Shorten it or lower Max Tokens.")
+        return
+
     # Construct the payload - force instruction mode
     payload = {
         "messages": messages,
@@ -172,34 +311,209 @@ def _handle_message_submission(
 
     # Store payload in session state for debug
     st.session_state.last_payload = payload
+
+    # The history above was rendered before this turn, so show the new message inline
+    with st.chat_message("user"):
+        st.markdown(server_message)
     
     try:
         _send_request_to_server(base_url, payload, server_message)
     except Exception as e:
         st.error(f"Exception occurred: {e}")
-        import traceback
-        st.code(traceback.format_exc())
+        st.code(_format_traceback(e))
+
+def _count_tokens(content: str) -> int:
+    """Estimate the token count of a message, memoised per content"""
+    counts = st.session_state.setdefault('token_counts', {})
+    count = counts.get(content)
+    if count is None:
+        encoder = get_token_encoder()
+        # Without a tokenizer, fall back to the usual ~4 characters per token estimate
+        count = counts[content] = len(encoder.encode(content)) if encoder else len(content) // 4
+    return count
+
+def _fit_to_context_window(messages: List[Dict[str, str]], max_tokens: int) -> bool:
+    """
+    Drop the oldest non-system messages until the prompt plus reply fits the model context
+
+    Returns False if the prompt still does not fit once only system messages and the
+    current user message remain.
+    """
+    limit = st.session_state.model_context_tokens
+    total = sum(_count_tokens(msg["content"]) for msg in messages) + max_tokens
+    dropped = []
+    while total > limit:
+        # The last message is the one being sent, so it is never dropped
+        index = next((i for i, msg in enumerate(messages[:-1]) if msg["role"] != "system"), None)
+        if index is None:
+            break
+        msg = messages.pop(index)
+        total -= _count_tokens(msg["content"])
+        dropped.append(msg)
+
+    if dropped:
+        st.warning(
+            "Dropped older turns to fit the context window:\n" +
+            "\n".join(f"- {msg['role'].capitalize()}: {msg['content'][:80]}" for msg in dropped)
+        )
+    return total <= limit
+
+def _post_json(
+    url: str,
+    body: bytes,
+    headers: Dict[str, str] = None,
+    compress: bool = False,
+    **kwargs
+) -> Tuple[requests.Response, bool]:
+    """
+    POST a JSON body, gzip-compressed if requested
+
+    Returns the response and whether the server refused the compressed body, in which
+    case the request was resent as plain JSON. Session state is left to the caller so
+    this stays safe to call from cached functions.
+    """
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    session = get_http_session()
+    if compress:
+        response = session.post(
+            url,
+            data=gzip.compress(body, compresslevel=1),
+            headers={**headers, "Content-Encoding": "gzip"},
+            **kwargs
+        )
+        if not _rejects_gzip(response):
+            return response, False
+        response.close()
+        return session.post(url, data=body, headers=headers, **kwargs), True
+    return session.post(url, data=body, headers=headers, **kwargs), False
+
+def _should_compress() -> bool:
+    """Compress when enabled in the parameters tab and this session's server has not refused it"""
+    return st.session_state.compress_requests and not st.session_state.get('gzip_rejected', False)
+
+def _rejects_gzip(response: requests.Response) -> bool:
+    """Tell a refused compressed body apart from a genuinely bad request"""
+    if response.status_code == GZIP_UNSUPPORTED_STATUS:
+        return True
+    # Streamed bodies are only read for a 400, which is small
+    return response.status_code == 400 and "encoding" in response.text.lower()
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _cached_completion(url: str, payload_json: bytes, compress: bool) -> Tuple[Dict[str, Any], bool]:
+    """
+    Post a low-temperature completion request; identical payloads are served from cache
+
+    The sorted payload JSON covers messages, temperature, max_tokens and stop, so any
+    change to those produces a new cache key. Returns the response data and whether the
+    server refused the compressed body.
+    """
+    response, gzip_rejected = _post_json(url, payload_json, compress=compress, timeout=30)
+    response.raise_for_status()
+    return orjson.loads(response.content), gzip_rejected
+
+def _get_history_summary(base_url: str) -> str:
+    """Return a rolling summary of the messages that fell out of the history window"""
+    roles = st.session_state.chat_history_roles
+    contents = st.session_state.chat_history_contents
+    dropped = max(len(contents) - HISTORY_WINDOW, 0)
+    summarised, summary = st.session_state.get('history_summary', (0, ""))
+
+    # Re-summarise once every SUMMARY_INTERVAL messages leave the window
+    if dropped - summarised >= SUMMARY_INTERVAL:
+        transcript = "\n\n".join(
+            f"{role.capitalize()}: {content}"
+            for role, content in zip(roles[summarised:dropped], contents[summarised:dropped])
+        )
+        if summary:
+            transcript = f"Earlier summary: {summary}\n\n{transcript}"
+        payload = {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Summarise the conversation below in a few sentences, keeping names, facts and decisions."
+                },
+                {"role": "user", "content": transcript}
+            ],
+            "mode": "instruct",
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "temperature": 0,
+        }
+        try:
+            response_data, gzip_rejected = _cached_completion(
+                f"{base_url}/chat/completions",
+                orjson.dumps(payload, option=orjson.OPT_SORT_KEYS),
+                _should_compress()
+            )
+            if gzip_rejected:
+                st.session_state.gzip_rejected = True
+            summary = response_data['choices'][0]['message']['content']
+            summarised = dropped
+            st.session_state.history_summary = (summarised, summary)
+        except requests.exceptions.RequestException:
+            pass  # Keep the previous summary and try again on the next send
+
+    return summary
 
 def _send_request_to_server(base_url: str, payload: Dict[str, Any], server_message: str) -> None:
     """Send the request to the server and handle the response"""
     try:
-        # Test connection first
-        requests.get(f"{base_url}/models", timeout=5)
-        
-        response = requests.post(
+        # Only (near-)deterministic requests are safe to answer from cache; the rest stream
+        if payload["temperature"] <= CACHE_MAX_TEMPERATURE:
+            try:
+                response_data, gzip_rejected = _cached_completion(
+                    f"{base_url}/chat/completions",
+                    orjson.dumps(payload, option=orjson.OPT_SORT_KEYS),
+                    _should_compress()
+                )
+            except requests.exceptions.HTTPError as e:
+                _report_server_error(e.response)
+                return
+            if gzip_rejected:
+                st.session_state.gzip_rejected = True
+            st.session_state.last_response = response_data
+            assistant_message = response_data['choices'][0]['message']['content']
+            with st.chat_message("assistant"):
+                st.markdown(assistant_message)
+            _handle_successful_response(assistant_message, server_message)
+            return
+
+        response, gzip_rejected = _post_json(
             f"{base_url}/chat/completions",
-            json=payload,
-            headers={"Content-Type": "application/json"},
+            orjson.dumps({**payload, "stream": True}),
+            headers={"Accept": "text/event-stream"},
+            compress=_should_compress(),
+            stream=True,
             timeout=30
         )
+        if gzip_rejected:
+            st.session_state.gzip_rejected = True
 
-        # Store response in session state for debug
-        st.session_state.last_response = response.json() if response.status_code == 200 else {"error": response.text}
+        if response.status_code != 200:
+            _report_server_error(response)
+            return
+
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            parts = []
+            completed = False
+            try:
+                for count, delta in enumerate(_iter_stream_tokens(response), 1):
+                    parts.append(delta)
+                    if count % STREAM_FLUSH_EVERY == 0:
+                        placeholder.markdown("".join(parts))
+                completed = True
+            finally:
+                # A rerun mid-stream interrupts the loop; keep what was already received
+                assistant_message = "".join(parts)
+                if not completed and assistant_message:
+                    _append_to_history(server_message, assistant_message)
+            placeholder.markdown(assistant_message)
 
-        if response.status_code == 200:
-            _handle_successful_response(response, server_message)
-        else:
-            st.error(f"Server error: {response.status_code}\n{response.text}")
+        # Store response in session state for debug
+        st.session_state.last_response = {
+            "choices": [{"message": {"role": "assistant", "content": assistant_message}}]
+        }
+        _handle_successful_response(assistant_message, server_message)
             
     except requests.exceptions.ConnectionError:
         st.error("Cannot connect to server. Please check:\n" +
@@ -211,25 +525,57 @@ def _send_request_to_server(base_url: str, payload: Dict[str, Any], server_messa
     except Exception as e:
         st.error(f"Unexpected error: {str(e)}")
         if st.session_state.get('debug_mode', False):
-            import traceback
-            st.code(traceback.format_exc())
+            st.code(_format_traceback(e))
+
+def _format_traceback(error: Exception) -> str:
+    """Format an exception's traceback, keeping only the innermost frames"""
+    return "".join(traceback.format_exception(
+        type(error), error, error.__traceback__, limit=-TRACEBACK_LIMIT
+    ))
 
-def _handle_successful_response(response: requests.Response, server_message: str) -> None:
+def _report_server_error(response: requests.Response) -> None:
+    """Show a failed response, including when the server asked us to retry"""
+    st.session_state.last_response = {"error": response.text}
+    message = f"Server error: {response.status_code}\n{response.text}"
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        message += f"\nThe server asked to retry after {retry_after} seconds."
+    st.error(message)
+
+def _iter_stream_tokens(response: requests.Response) -> Iterator[str]:
+    """Yield completion tokens from a server-sent event stream as they arrive"""
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            # Server-sent events carry one JSON chunk per "data:" line
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            delta = orjson.loads(data)['choices'][0].get('delta', {}).get('content')
+            if delta:
+                yield delta
+
+def _handle_successful_response(assistant_message: str, server_message: str) -> None:
     """Handle a successful response from the server"""
-    response_data = response.json()
-    
-    # Extract the response content
-    assistant_message = response_data['choices'][0]['message']['content']
-    
-    # Add messages to chat history
-    st.session_state.chat_history.extend([
-        {"content": server_message, "is_user": True},
-        {"content": assistant_message, "is_user": False}
+    _append_to_history(server_message, assistant_message)
+    st.success("Message sent successfully")
+
+def _append_to_history(server_message: str, assistant_message: str) -> None:
+    """Record a user/assistant exchange in session state and local storage"""
+    st.session_state.chat_history_roles.extend(["user", "assistant"])
+    st.session_state.chat_history_contents.extend([server_message, assistant_message])
+    st.session_state.chat_history_messages.extend([
+        {"role": "user", "content": server_message},
+        {"role": "assistant", "content": assistant_message}
     ])
+    offsets = st.session_state.chat_history_offsets
+    offsets.append(offsets[-1] + len(server_message))
+    offsets.append(offsets[-1] + len(assistant_message))
     
-    # Save chat history to local storage
-    with open('chat_history.json', 'w') as f:
-        json.dump(st.session_state.chat_history, f)
-    
-    st.success("Message sent successfully")
-    st.rerun()
\ No newline at end of file
+    # Append only this turn's entries to local storage
+    with open(CHAT_HISTORY_FILE, 'ab') as f:
+        f.write(
+            orjson.dumps({"content": server_message, "is_user": True}) + b"\n"
+            + orjson.dumps({"content": assistant_message, "is_user": False}) + b"\n"
+        )
\ No newline at end of file
@@ -1,8 +1,18 @@
 # ./ServerMessage/tabs/combat_tab.py
 
 import streamlit as st
+import requests
+from .chat_tab import complete_many
 
-def render_combat_tab():
+# Session-state key suffix holding the detail widget for each action type
+ACTION_DETAIL_KEYS = {
+    "Attack": "attack_select",
+    "Spell": "spell_select",
+    "Move": "move_distance",
+    "Item": "item_select",
+}
+
+def render_combat_tab(base_url: str):
     """Render the combat interface tab"""
     st.header("Combat Interface")
 
@@ -13,8 +23,11 @@ def render_combat_tab():
         st.session_state.combat_round = 1
     if 'combat_distance' not in st.session_state:
         st.session_state.combat_distance = 30
-    if 'current_effects' not in st.session_state:
-        st.session_state.current_effects = []
+    if 'effect_names' not in st.session_state:
+        st.session_state.effect_names = []
+        st.session_state.effect_durations = []
+    if 'combat_log' not in st.session_state:
+        st.session_state.combat_log = []
 
     # Combat Controls
     col1, col2, col3 = st.columns(3)
@@ -22,13 +35,14 @@ def render_combat_tab():
         if not st.session_state.combat_active:
             if st.button("Start Combat", key="start_combat_btn"):
                 st.session_state.combat_active = True
-                st.experimental_rerun()
+                st.rerun()
         else:
             if st.button("End Combat", key="end_combat_btn"):
                 st.session_state.combat_active = False
                 st.session_state.combat_round = 1
-                st.session_state.current_effects = []
-                st.experimental_rerun()
+                st.session_state.effect_names = []
+                st.session_state.effect_durations = []
+                st.rerun()
     
     with col2:
         st.metric("Current Round", st.session_state.combat_round)
@@ -48,24 +62,7 @@ def render_combat_tab():
             
             # PC Actions
             with st.expander("Available Actions"):
-                action_type = st.radio(
-                    "Action Type",
-                    ["Attack", "Spell", "Skill", "Move", "Item"],
-                    key="pc_action_type"
-                )
-                
-                if action_type == "Attack":
-                    st.selectbox("Choose Attack", ["Basic Attack", "Power Attack"], key="pc_attack_select")
-                elif action_type == "Spell":
-                    st.selectbox("Choose Spell", ["Fireball", "Heal", "Shield"], key="pc_spell_select")
-                    st.number_input("MP Cost", min_value=0, value=10, key="pc_spell_cost")
-                elif action_type == "Move":
-                    st.number_input("Movement Distance", min_value=0, max_value=30, value=5, key="pc_move_distance")
-                elif action_type == "Item":
-                    st.selectbox("Choose Item", ["Health Potion", "Mana Potion"], key="pc_item_select")
-
-                if st.button("Execute Action", key="pc_execute_btn"):
-                    pass  # Implement action execution
+                _action_panel("pc")
 
         with col2:
             st.subheader("NPC")
@@ -75,59 +72,99 @@ def render_combat_tab():
             
             # NPC Actions
             with st.expander("Available Actions"):
-                action_type = st.radio(
-                    "Action Type",
-                    ["Attack", "Spell", "Skill", "Move", "Item"],
-                    key="npc_action_type"
-                )
-                
-                if action_type == "Attack":
-                    st.selectbox("Choose Attack", ["Basic Attack", "Power Attack"], key="npc_attack_select")
-                elif action_type == "Spell":
-                    st.selectbox("Choose Spell", ["Fireball", "Heal", "Shield"], key="npc_spell_select")
-                    st.number_input("MP Cost", min_value=0, value=10, key="npc_spell_cost")
-                elif action_type == "Move":
-                    st.number_input("Movement Distance", min_value=0, max_value=30, value=5, key="npc_move_distance")
-                elif action_type == "Item":
-                    st.selectbox("Choose Item", ["Health Potion", "Mana Potion"], key="npc_item_select")
-
-                if st.button("Execute Action", key="npc_execute_btn"):
-                    pass  # Implement action execution
+                _action_panel("npc")
 
         # Active Effects
         st.subheader("Active Effects")
-        if st.session_state.current_effects:
-            for effect in st.session_state.current_effects:
-                st.write(f"{effect['name']} - {effect['duration']} rounds remaining")
+        if st.session_state.effect_names:
+            for name, duration in zip(st.session_state.effect_names, st.session_state.effect_durations):
+                st.write(f"{name} - {duration} rounds remaining")
         else:
             st.write("No active effects")
 
+        # Narrate both combatants' chosen actions with concurrent requests
+        if st.button("Narrate Actions", key="narrate_actions_btn"):
+            combatants = [("Player Character", "pc"), ("NPC", "npc")]
+            payloads = [_build_turn_payload(name, prefix) for name, prefix in combatants]
+            try:
+                with st.spinner("Narrating actions..."):
+                    narrations = complete_many(base_url, payloads)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Could not narrate actions: {e}")
+            else:
+                for (name, _), narration in zip(combatants, narrations):
+                    st.session_state.combat_log.append(
+                        f"Round {st.session_state.combat_round} - {name}: {narration}"
+                    )
+
         # Combat Log
         with st.expander("Combat Log", expanded=True):
-            if 'combat_log' not in st.session_state:
-                st.session_state.combat_log = []
-            
             for log_entry in st.session_state.combat_log:
                 st.text(log_entry)
 
         # Next Round Button
         if st.button("Next Round", key="next_round_btn"):
             st.session_state.combat_round += 1
-            # Update effects duration
-            updated_effects = []
-            for effect in st.session_state.current_effects:
-                if effect['duration'] > 1:
-                    effect['duration'] -= 1
-                    updated_effects.append(effect)
-            st.session_state.current_effects = updated_effects
-            st.experimental_rerun()
+            # Tick every effect down one round and drop the ones that expire
+            kept = [i for i, duration in enumerate(st.session_state.effect_durations) if duration > 1]
+            st.session_state.effect_names = [st.session_state.effect_names[i] for i in kept]
+            st.session_state.effect_durations = [st.session_state.effect_durations[i] - 1 for i in kept]
+            st.rerun()
+
+@st.fragment
+def _action_panel(prefix: str) -> None:
+    """Action pickers for one combatant, rerun on their own when the choice changes"""
+    action_type = st.radio(
+        "Action Type",
+        ["Attack", "Spell", "Skill", "Move", "Item"],
+        key=f"{prefix}_action_type"
+    )
+    
+    if action_type == "Attack":
+        st.selectbox("Choose Attack", ["Basic Attack", "Power Attack"], key=f"{prefix}_attack_select")
+    elif action_type == "Spell":
+        st.selectbox("Choose Spell", ["Fireball", "Heal", "Shield"], key=f"{prefix}_spell_select")
+        st.number_input("MP Cost", min_value=0, value=10, key=f"{prefix}_spell_cost")
+    elif action_type == "Move":
+        st.number_input("Movement Distance", min_value=0, max_value=30, value=5, key=f"{prefix}_move_distance")
+    elif action_type == "Item":
+        st.selectbox("Choose Item", ["Health Potion", "Mana Potion"], key=f"{prefix}_item_select")
+
+    if st.button("Execute Action", key=f"{prefix}_execute_btn"):
+        pass  # Implement action execution
+
+def _build_turn_payload(combatant: str, prefix: str) -> dict:
+    """Build the completion payload narrating one combatant's selected action"""
+    action_type = st.session_state.get(f"{prefix}_action_type", "Attack")
+    detail_key = ACTION_DETAIL_KEYS.get(action_type)
+    detail = st.session_state.get(f"{prefix}_{detail_key}") if detail_key else None
+    action = f"{action_type} ({detail})" if detail is not None else action_type
+    return {
+        "messages": [
+            {
+                "role": "system",
+                "content": "You narrate turns of a tabletop RPG combat. Describe the outcome of the action in two or three sentences."
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Round {st.session_state.combat_round}, combatants are "
+                    f"{st.session_state.combat_distance} ft apart. {combatant} uses {action}."
+                )
+            }
+        ],
+        "mode": "instruct",
+        "max_tokens": st.session_state.max_tokens,
+        "temperature": st.session_state.temperature,
+    }
 
 def add_effect(name, duration):
     """Add a new effect to the combat"""
-    if 'current_effects' not in st.session_state:
-        st.session_state.current_effects = []
+    if 'effect_names' not in st.session_state:
+        st.session_state.effect_names = []
+        st.session_state.effect_durations = []
+    if 'combat_log' not in st.session_state:
+        st.session_state.combat_log = []
     
-    st.session_state.current_effects.append({
-        'name': name,
-        'duration': duration
-    })
\ No newline at end of file
+    st.session_state.effect_names.append(name)
+    st.session_state.effect_durations.append(duration)
\ No newline at end of file
@@ -5,6 +5,11 @@ import streamlit as st
 def render_debug_tab():
     """Render the debug information tab"""
     st.header("Debug Information")
+
+    # Payload and state dumps can be large, so only render them on request
+    if not st.session_state.get('debug_mode', False):
+        st.info("Enable Debug mode in the sidebar to inspect payloads and session state.")
+        return
     
     if hasattr(st.session_state, 'last_payload'):
         st.write("Last sent payload:")
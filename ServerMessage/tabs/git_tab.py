@@ -2,20 +2,28 @@
 
 import streamlit as st
 import subprocess
+import sqlite3
+import importlib
 import sys
 import os
 import time
 
+# Files whose changes cannot be picked up by Streamlit's file watcher
+HARD_RESTART_FILES = ("requirements.txt",)
+
+# The tracked database; its WAL is folded back into it before a pull may replace the file
+DATABASE_FILE = "rpg_data.db"
+
 def render_git_tab(script_dir: str, repo_root: str):
     """
     Render the git updates tab
-    
+
     Args:
         script_dir (str): The directory containing the script
         repo_root (str): The root directory of the git repository
     """
     st.header("Update Project")
-    st.write("Update the project code from the git repository and restart the application.")
+    st.write("Update the project code from the git repository and reload the application.")
 
     # Show previous git results if they exist
     if st.session_state.show_git_results and st.session_state.git_output:
@@ -24,39 +32,161 @@ def render_git_tab(script_dir: str, repo_root: str):
         st.text(st.session_state.git_output["stdout"])
         st.text("Git pull stderr:")
         st.text(st.session_state.git_output["stderr"])
-    
+        if st.session_state.get("dependencies_changed"):
+            st.warning("Dependencies changed: reinstall them (pip install -r requirements.txt), then restart.")
+        if st.button("Restart now", key="restart_now_btn"):
+            # Replace this process with a fresh Streamlit server running the same script
+            os.execv(sys.executable, [sys.executable, "-m", "streamlit", "run", *sys.argv])
+
     if st.button("Update and Restart", key="update_restart_btn"):
-        with st.spinner("Pulling latest code from git (repository root)..."):
-            # Run "git pull" in the repository root directory
-            git_proc = subprocess.run(
-                ["git", "pull"],
-                cwd=repo_root,
-                capture_output=True,
-                text=True
-            )
-            
+        with st.spinner("Checking for new commits..."):
+            behind, error = _count_incoming_commits(repo_root)
+        if error:
+            st.error(f"Could not check for updates:\n{error}")
+            return
+        if behind == 0:
+            st.info("Already up to date.")
+            return
+
+        with st.spinner(f"Pulling {behind} new commit(s) from git (repository root)..."):
+            old_head = _get_head(repo_root)
+            checkpoint_error = _checkpoint_database(repo_root)
+            if checkpoint_error:
+                st.error(f"Could not checkpoint {DATABASE_FILE} before pulling:\n{checkpoint_error}")
+                return
+
+            # Fast-forward the repository root to the fetched upstream
+            git_proc = _run_with_progress(["git", "pull", "--ff-only", "--quiet"], repo_root)
+
+            if git_proc.returncode != 0:
+                # A diverged or dirty tree refuses the fast-forward; nothing was updated
+                st.error(f"Git pull failed:\n{git_proc.stderr}")
+                return
+
             # Store the output in session state
             st.session_state.git_output = {
                 "stdout": git_proc.stdout,
                 "stderr": git_proc.stderr
             }
             st.session_state.show_git_results = True
-            
+            st.session_state.dependencies_changed = False
+
             # Display the current results
             st.success("Git Update Results:")
             st.text("Git pull stdout:")
             st.text(git_proc.stdout)
             st.text("Git pull stderr:")
             st.text(git_proc.stderr)
-            
+
             st.success("Git update complete.")
-            st.info("The application will restart in 5 seconds...")
-            time.sleep(5)  # Give time to read the output
-            
-            # Restart the application
-            os.chdir(script_dir)
-            new_script = os.path.join(script_dir, "main.py")
-            os.execv(
-                sys.executable,
-                [sys.executable, "-m", "streamlit", "run", new_script] + sys.argv[1:]
-            )
\ No newline at end of file
+
+            changed_files = _get_changed_files(repo_root, old_head)
+            if not changed_files:
+                st.info("Already up to date.")
+                return
+            if any(os.path.basename(path) in HARD_RESTART_FILES for path in changed_files):
+                # Dependencies changed: leave the restart to the user, via the "Restart now"
+                # button above, once the new requirements are installed
+                st.session_state.dependencies_changed = True
+                st.rerun()
+
+            # Reload changed tab modules in place; main.py itself is re-executed on rerun
+            _reload_tab_modules(script_dir, repo_root, changed_files)
+            # The results stay visible above after the rerun, next to the "Restart now" button
+            st.rerun()
+
+def _run_with_progress(cmd: list, cwd: str) -> subprocess.CompletedProcess:
+    """Run a command, polling it so the page shows elapsed time instead of freezing"""
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    progress = st.empty()
+    started = time.monotonic()
+    while True:
+        try:
+            # communicate() drains both pipes, so a chatty command cannot fill them and stall
+            stdout, stderr = proc.communicate(timeout=0.1)
+            break
+        except subprocess.TimeoutExpired:
+            progress.caption(f"Running {' '.join(cmd)}... {time.monotonic() - started:.1f}s")
+    progress.empty()
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+def _checkpoint_database(repo_root: str) -> str:
+    """Move any pending WAL frames into the database file and empty the WAL; returns an error message, or an empty string on success"""
+    db_path = os.path.join(repo_root, DATABASE_FILE)
+    if not os.path.exists(db_path):
+        return ""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return str(e)
+    return "Database is busy; try again once pending saves finish" if busy else ""
+
+def _reload_tab_modules(script_dir: str, repo_root: str, changed_files: list) -> None:
+    """Reload any already-imported tab modules touched by the update"""
+    tabs_dir = os.path.relpath(os.path.join(script_dir, "tabs"), repo_root)
+    reloaded = False
+    for path in changed_files:
+        directory, filename = os.path.split(os.path.normpath(path))
+        if directory != tabs_dir or not filename.endswith(".py") or filename == "__init__.py":
+            continue
+        module = sys.modules.get(f"tabs.{filename[:-3]}")
+        if module is not None:
+            importlib.reload(module)
+            reloaded = True
+
+    # Re-bind the package-level names to the reloaded modules
+    if reloaded and "tabs" in sys.modules:
+        importlib.reload(sys.modules["tabs"])
+
+def _count_incoming_commits(repo_root: str) -> tuple:
+    """Fetch upstream and return (commits behind, error output)"""
+    fetch_proc = subprocess.run(
+        ["git", "fetch", "--quiet"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True
+    )
+    if fetch_proc.returncode != 0:
+        return 0, fetch_proc.stderr
+    count_proc = subprocess.run(
+        ["git", "rev-list", "--count", "HEAD..@{u}"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True
+    )
+    if count_proc.returncode != 0:
+        return 0, count_proc.stderr
+    return int(count_proc.stdout.strip()), ""
+
+def _get_head(repo_root: str) -> str:
+    """Return the current HEAD commit hash, or an empty string if unavailable"""
+    proc = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True
+    )
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+def _get_changed_files(repo_root: str, old_head: str) -> list:
+    """Return the files changed between old_head and the current HEAD"""
+    new_head = _get_head(repo_root)
+    if not old_head or not new_head or old_head == new_head:
+        return []
+    proc = subprocess.run(
+        ["git", "diff", "--name-only", old_head, new_head],
+        cwd=repo_root,
+        capture_output=True,
+        text=True
+    )
+    return proc.stdout.splitlines()
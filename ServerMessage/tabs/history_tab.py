@@ -1,20 +1,23 @@
 # ./ServerMessage/tabs/history_tab.py
 
 import streamlit as st
+from .chat_tab import compose_history_markdown, CHAT_HISTORY_FILE
 
 def render_history_tab():
     """Render the chat history tab"""
     st.header("Chat History")
     
     if st.button("Clear History", key="clear_history_btn"):
-        st.session_state.chat_history = []
-        st.experimental_rerun()
+        st.session_state.chat_history_roles = []
+        st.session_state.chat_history_contents = []
+        st.session_state.chat_history_messages = []
+        st.session_state.chat_history_offsets = [0]
+        st.session_state.history_summary = (0, "")
+        # The history file is append-only, so truncate it or the cleared turns reload
+        open(CHAT_HISTORY_FILE, 'wb').close()
+        st.session_state.history_rendered_len = 0
+        # The chat tab already rendered the old history this run, so redraw it
+        st.rerun()
     
-    for message in st.session_state.chat_history:
-        with st.container():
-            if message["is_user"]:
-                st.markdown("**User:**")
-            else:
-                st.markdown("**Assistant:**")
-            st.write(message["content"])
-            st.divider()
\ No newline at end of file
+    if st.session_state.chat_history_contents:
+        st.markdown(compose_history_markdown())
\ No newline at end of file
@@ -1,6 +1,10 @@
 # ./ServerMessage/tabs/npc_summary_tab.py
 
 import streamlit as st
+import uuid
+
+_RACES = ("Humanoid", "Demi-Human", "Heteromorphic")
+_CLASSES = ("Magic Caster", "Martial", "Shadow", "Wayfarer", "Leader", "Laborer")
 
 def render_npc_summary_tab():
     """Render the NPC character summary tab"""
@@ -13,19 +17,26 @@ def render_npc_summary_tab():
 
     # Level Progression
     with st.expander("Level Progression", expanded=True):
-        st.subheader("Race Levels")
-        
-        # Dynamic race level entries
+        # Dynamic race and class level entries, keyed by a stable row id so widget keys survive removals
         if 'npc_race_levels' not in st.session_state:
-            st.session_state.npc_race_levels = [{"race": "", "level": 1}]
+            st.session_state.npc_race_levels = {uuid.uuid4().hex: {"race": "", "level": 1}}
+        if 'npc_class_levels' not in st.session_state:
+            st.session_state.npc_class_levels = {uuid.uuid4().hex: {"class": "", "level": 1}}
+        # Running total, adjusted by the level callbacks and row add/remove instead of re-summed
+        if 'npc_total_levels' not in st.session_state:
+            st.session_state.npc_total_levels = sum(
+                row["level"] for row in st.session_state.npc_race_levels.values()
+            ) + sum(row["level"] for row in st.session_state.npc_class_levels.values())
+
+        st.subheader("Race Levels")
         
-        for i, race_level in enumerate(st.session_state.npc_race_levels):
+        for row_id, race_level in list(st.session_state.npc_race_levels.items()):
             col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
                 race = st.selectbox(
                     "Race",
-                    options=["Humanoid", "Demi-Human", "Heteromorphic"], 
-                    key=f"npc_race_select_{i}"
+                    options=_RACES,
+                    key=f"npc_race_select_{row_id}"
                 )
             with col2:
                 level = st.number_input(
@@ -33,30 +44,29 @@ def render_npc_summary_tab():
                     min_value=1,
                     max_value=100,
                     value=race_level["level"],
-                    key=f"npc_race_level_{i}"
+                    key=f"npc_race_level_{row_id}",
+                    on_change=_update_level,
+                    args=("npc_race_levels", row_id, f"npc_race_level_{row_id}")
                 )
             with col3:
-                if st.button("Remove", key=f"npc_remove_race_{i}"):
-                    st.session_state.npc_race_levels.pop(i)
-                    st.experimental_rerun()
+                if st.button("Remove", key=f"npc_remove_race_{row_id}"):
+                    st.session_state.npc_total_levels -= st.session_state.npc_race_levels.pop(row_id)["level"]
+                    st.rerun()
         
         if st.button("Add Race Level", key="npc_add_race_btn"):
-            st.session_state.npc_race_levels.append({"race": "", "level": 1})
-            st.experimental_rerun()
+            st.session_state.npc_race_levels[uuid.uuid4().hex] = {"race": "", "level": 1}
+            st.session_state.npc_total_levels += 1
+            st.rerun()
 
         st.subheader("Class Levels")
         
-        # Dynamic class level entries
-        if 'npc_class_levels' not in st.session_state:
-            st.session_state.npc_class_levels = [{"class": "", "level": 1}]
-        
-        for i, class_level in enumerate(st.session_state.npc_class_levels):
+        for row_id, class_level in list(st.session_state.npc_class_levels.items()):
             col1, col2, col3, col4 = st.columns([3, 1, 2, 1])
             with col1:
                 class_name = st.selectbox(
                     "Class",
-                    options=["Magic Caster", "Martial", "Shadow", "Wayfarer", "Leader", "Laborer"],
-                    key=f"npc_class_select_{i}"
+                    options=_CLASSES,
+                    key=f"npc_class_select_{row_id}"
                 )
             with col2:
                 level = st.number_input(
@@ -64,27 +74,28 @@ def render_npc_summary_tab():
                     min_value=1,
                     max_value=15,  # Base classes max at 15
                     value=class_level["level"],
-                    key=f"npc_class_level_{i}"
+                    key=f"npc_class_level_{row_id}",
+                    on_change=_update_level,
+                    args=("npc_class_levels", row_id, f"npc_class_level_{row_id}")
                 )
             with col3:
                 st.text_input(
                     "Unlocked Abilities",
-                    key=f"npc_class_abilities_{i}",
+                    key=f"npc_class_abilities_{row_id}",
                     help="Abilities unlocked at this level"
                 )
             with col4:
-                if st.button("Remove", key=f"npc_remove_class_{i}"):
-                    st.session_state.npc_class_levels.pop(i)
-                    st.experimental_rerun()
+                if st.button("Remove", key=f"npc_remove_class_{row_id}"):
+                    st.session_state.npc_total_levels -= st.session_state.npc_class_levels.pop(row_id)["level"]
+                    st.rerun()
         
         if st.button("Add Class Level", key="npc_add_class_btn"):
-            st.session_state.npc_class_levels.append({"class": "", "level": 1})
-            st.experimental_rerun()
+            st.session_state.npc_class_levels[uuid.uuid4().hex] = {"class": "", "level": 1}
+            st.session_state.npc_total_levels += 1
+            st.rerun()
 
         # Total level display
-        total_levels = sum(rl["level"] for rl in st.session_state.npc_race_levels) + \
-                      sum(cl["level"] for cl in st.session_state.npc_class_levels)
-        st.info(f"Total Character Level: {total_levels}/100")
+        st.info(f"Total Character Level: {st.session_state.npc_total_levels}/100")
 
     # Stats
     with st.expander("Statistics", expanded=True):
@@ -132,4 +143,11 @@ def render_npc_summary_tab():
             pass  # Functionality to be added
     with col2:
         if st.button("Load NPC", key="load_npc_btn"):
-            pass  # Functionality to be added
\ No newline at end of file
+            pass  # Functionality to be added
+
+def _update_level(rows_key: str, row_id: str, widget_key: str):
+    """Store a changed level on its row and shift the running total by the difference"""
+    row = st.session_state[rows_key][row_id]
+    new_level = st.session_state[widget_key]
+    st.session_state.npc_total_levels += new_level - row["level"]
+    row["level"] = new_level
\ No newline at end of file
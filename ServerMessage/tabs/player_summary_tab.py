@@ -6,36 +6,43 @@ def render_player_summary_tab():
     """Render the Player character summary tab"""
     st.header("Player Character Summary")
 
+    # The plain input sections are forms, so edits reach the server in one batch on
+    # "Update" instead of rerunning the tab per field; button-driven sections stay outside
+
     # Basic Info
     with st.expander("Basic Information", expanded=True):
-        col1, col2 = st.columns(2)
-        with col1:
-            st.text_input("Character Name", key="pc_name_input")
-            st.text_input("Race", key="pc_race_input")
-            st.text_input("Primary Class", key="pc_primary_class_input")
-        with col2:
-            st.number_input("Level", min_value=1, max_value=100, value=1, key="pc_level_input")
-            st.text_input("Secondary Class", key="pc_secondary_class_input")
-            st.text_input("Alignment", key="pc_alignment_input")
+        with st.form("pc_basic_info_form", border=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.text_input("Character Name", key="pc_name_input")
+                st.text_input("Race", key="pc_race_input")
+                st.text_input("Primary Class", key="pc_primary_class_input")
+            with col2:
+                st.number_input("Level", min_value=1, max_value=100, value=1, key="pc_level_input")
+                st.text_input("Secondary Class", key="pc_secondary_class_input")
+                st.text_input("Alignment", key="pc_alignment_input")
+            st.form_submit_button("Update")
 
     # Stats
     with st.expander("Statistics", expanded=True):
-        col1, col2, col3 = st.columns(3)
+        with st.form("pc_stats_form", border=False):
+            col1, col2, col3 = st.columns(3)
         
-        with col1:
-            st.number_input("Strength", min_value=1, max_value=100, value=10, key="pc_str_input")
-            st.number_input("Dexterity", min_value=1, max_value=100, value=10, key="pc_dex_input")
-            st.number_input("Constitution", min_value=1, max_value=100, value=10, key="pc_con_input")
+            with col1:
+                st.number_input("Strength", min_value=1, max_value=100, value=10, key="pc_str_input")
+                st.number_input("Dexterity", min_value=1, max_value=100, value=10, key="pc_dex_input")
+                st.number_input("Constitution", min_value=1, max_value=100, value=10, key="pc_con_input")
         
-        with col2:
-            st.number_input("Intelligence", min_value=1, max_value=100, value=10, key="pc_int_input")
-            st.number_input("Wisdom", min_value=1, max_value=100, value=10, key="pc_wis_input")
-            st.number_input("Charisma", min_value=1, max_value=100, value=10, key="pc_cha_input")
+            with col2:
+                st.number_input("Intelligence", min_value=1, max_value=100, value=10, key="pc_int_input")
+                st.number_input("Wisdom", min_value=1, max_value=100, value=10, key="pc_wis_input")
+                st.number_input("Charisma", min_value=1, max_value=100, value=10, key="pc_cha_input")
         
-        with col3:
-            st.number_input("HP", min_value=1, value=10, key="pc_hp_input")
-            st.number_input("MP", min_value=0, value=10, key="pc_mp_input")
-            st.number_input("Special", min_value=0, value=0, key="pc_special_input")
+            with col3:
+                st.number_input("HP", min_value=1, value=10, key="pc_hp_input")
+                st.number_input("MP", min_value=0, value=10, key="pc_mp_input")
+                st.number_input("Special", min_value=0, value=0, key="pc_special_input")
+            st.form_submit_button("Update")
 
     # Skills and Spells
     with st.expander("Skills & Spells", expanded=True):
@@ -67,8 +74,10 @@ def render_player_summary_tab():
 
     # Character Background
     with st.expander("Character Background", expanded=True):
-        st.text_area("Background Story", height=200, key="pc_background_input")
-        st.text_input("Notable Achievements", key="pc_achievements_input")
+        with st.form("pc_background_form", border=False):
+            st.text_area("Background Story", height=200, key="pc_background_input")
+            st.text_input("Notable Achievements", key="pc_achievements_input")
+            st.form_submit_button("Update")
 
     # Save/Load
     col1, col2 = st.columns(2)
@@ -3,7 +3,17 @@
 Spell Effect Manager module for managing spell effects and wrappers in the RPG system.
 """
 
-from .spell_effect_editor import render_spell_effect_editor
-from .spell_wrappers import render_spell_wrappers
+# The editor modules are imported on first render, so loading the package does not
+# pull in their database and form chains until one of these pages is opened
 
-__all__ = ['render_spell_effect_editor', 'render_spell_wrappers']
\ No newline at end of file
+def render_spell_effect_editor(*args, **kwargs):
+    """Render the spell effect editor interface."""
+    from .interface import render_spell_effect_editor as _render
+    return _render(*args, **kwargs)
+
+def render_spell_wrappers(*args, **kwargs):
+    """Render the spell wrappers editor."""
+    from .spell_wrappers import render_spell_wrappers as _render
+    return _render(*args, **kwargs)
+
+__all__ = ['render_spell_effect_editor', 'render_spell_wrappers']
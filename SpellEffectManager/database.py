@@ -1,7 +1,38 @@
 # ./SpellEffectManager/database.py
 
-from utils.database import fetch_all, execute_transaction
+import sqlite3
+import streamlit as st
+from utils.database import get_db_connection, fetch_all, execute_many_transaction, TRANSACTION_LOCK
 from typing import List, Dict, Optional, Tuple
+from .models import SpellEffect, DamageData
+
+# Idempotent schema additions; the editors upsert spells and resources by name and damage
+# effects and targeting by their owner, every editor listing is ordered by name, and a
+# wrapper's effects and cost rows are looked up by spell
+_SCHEMA_MIGRATIONS = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_spells_name ON spells(name)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_resources_name ON resources(name)",
+    "CREATE INDEX IF NOT EXISTS idx_spell_effects_name ON spell_effects(name)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_damage_effects_spell_effect ON damage_effects(spell_effect_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_spell_targeting_spell ON spell_targeting(spell_id)",
+    "CREATE INDEX IF NOT EXISTS idx_spell_has_effects_spell_order ON spell_has_effects(spell_id, effect_order)",
+    "CREATE INDEX IF NOT EXISTS idx_spell_costs_spell ON spell_costs(spell_id)",
+)
+
+# damage_effects columns loaded alongside a spell effect's own fields
+_DAMAGE_FIELDS = ('range_type_id', 'range_distance', 'base_damage', 'resistance_save_id')
+
+@st.cache_resource
+def apply_schema_migrations() -> None:
+    """Apply the spell editors' schema migrations once per process."""
+    conn = get_db_connection()
+    # Outside the lock these would land inside a save still open on the shared connection
+    with TRANSACTION_LOCK:
+        for statement in _SCHEMA_MIGRATIONS:
+            try:
+                conn.execute(statement)
+            except sqlite3.IntegrityError as e:
+                st.warning(f"Could not apply schema migration, existing rows conflict: {e}")
 
 def get_spell_effects() -> List[Dict]:
     """Get list of all spell effects."""
@@ -14,54 +45,76 @@ def get_spell_effects() -> List[Dict]:
         ORDER BY se.name
     """)
 
-def get_spell_effect_details(effect_id: int) -> Optional[Dict]:
+@st.cache_data(ttl=60, show_spinner=False)
+def get_spell_effect_details(effect_id: int) -> Optional[SpellEffect]:
     """Get full details of a specific spell effect."""
     effects = fetch_all("""
         SELECT 
             se.id, se.name, se.description, se.effect_type_id, se.magic_school_id,
-            et.name as effect_type_name
+            et.name as effect_type_name,
+            de.range_type_id, de.range_distance, de.base_damage, de.resistance_save_id
         FROM spell_effects se
         JOIN effect_types et ON se.effect_type_id = et.id
+        LEFT JOIN damage_effects de ON de.spell_effect_id = se.id
         WHERE se.id = ?
     """, (effect_id,))
     if not effects:
         return None
-    effect_data = effects[0]
-    if effect_data['effect_type_name'] == 'damage':
-        damage_data = fetch_all("""
-            SELECT range_type_id, range_distance, base_damage, resistance_save_id
-            FROM damage_effects
-            WHERE spell_effect_id = ?
-        """, (effect_id,))
-        effect_data['damage_data'] = damage_data[0] if damage_data else {}
-    return effect_data
+    row = effects[0]
+    damage_row = {key: row.pop(key) for key in _DAMAGE_FIELDS}
+    effect = SpellEffect(**row)
+    if effect.effect_type_name == 'damage':
+        # The LEFT JOIN yields NULLs when the damage row is missing; range_type_id is NOT NULL otherwise
+        effect.damage_data = DamageData(**damage_row) if damage_row['range_type_id'] is not None else DamageData()
+    return effect
 
-def save_spell_effect(data: Dict) -> Tuple[bool, str]:
+def save_spell_effect(effect: SpellEffect) -> Tuple[bool, str]:
     """Save or update a spell effect."""
+    is_update = bool(effect.id)
     try:
-        if data.get('id'):
-            execute_transaction("""
+        if is_update:
+            statements = [("""
                 UPDATE spell_effects 
                 SET name=?, description=?, effect_type_id=?, magic_school_id=?
                 WHERE id=?
-            """, (data['name'], data['description'], data['effect_type_id'], data['magic_school_id'], data['id']))
+            """, (effect.name, effect.description, effect.effect_type_id, effect.magic_school_id, effect.id))]
         else:
-            data['id'] = execute_transaction("""
+            statements = [("""
                 INSERT INTO spell_effects (name, description, effect_type_id, magic_school_id)
                 VALUES (?, ?, ?, ?)
-            """, (data['name'], data['description'], data['effect_type_id'], data['magic_school_id']))
+            """, (effect.name, effect.description, effect.effect_type_id, effect.magic_school_id))]
 
-        if data['effect_type_name'] == 'damage':
-            execute_transaction("DELETE FROM damage_effects WHERE spell_effect_id=?", (data['id'],))
-            execute_transaction("""
+        if effect.effect_type_name == 'damage':
+            damage = effect.damage_data
+            # A new effect has no id yet; it is the row the INSERT above just created
+            statements.append(("""
                 INSERT INTO damage_effects (spell_effect_id, range_type_id, range_distance, base_damage, resistance_save_id)
-                VALUES (?, ?, ?, ?, ?)
-            """, (data['id'], data['damage_data']['range_type_id'], data['damage_data']['range_distance'],
-                  data['damage_data']['base_damage'], data['damage_data']['resistance_save_id']))
-        return True, f"Spell effect {'updated' if 'id' in data else 'created'} successfully!"
+                VALUES (COALESCE(?, last_insert_rowid()), ?, ?, ?, ?)
+                ON CONFLICT(spell_effect_id) DO UPDATE SET
+                    range_type_id=excluded.range_type_id, range_distance=excluded.range_distance,
+                    base_damage=excluded.base_damage, resistance_save_id=excluded.resistance_save_id
+            """, (effect.id, damage.range_type_id, damage.range_distance,
+                  damage.base_damage, damage.resistance_save_id)))
+
+        row_ids = execute_many_transaction(statements)
+        if not is_update:
+            effect.id = row_ids[0]
+        get_spell_effect_details.clear()
+        return True, f"Spell effect {'updated' if is_update else 'created'} successfully!"
     except Exception as e:
         return False, f"Error saving spell effect: {str(e)}"
 
-def get_reference_data(table: str) -> List[Dict]:
-    """Fetch reference data from a table."""
-    return fetch_all(f"SELECT id, name FROM {table} ORDER BY name")
\ No newline at end of file
+# Lookup tables read by the effect form, fetched together by get_all_reference_data
+_REFERENCE_TABLES = ('effect_types', 'magic_schools', 'range_types', 'stat_types')
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_all_reference_data() -> Dict[str, List[Dict]]:
+    """Fetch every lookup table in one UNION ALL query, bucketed by table name."""
+    reference = {table: [] for table in _REFERENCE_TABLES}
+    rows = fetch_all(
+        " UNION ALL ".join(f"SELECT '{table}' AS kind, id, name FROM {table}" for table in _REFERENCE_TABLES)
+        + " ORDER BY kind, name"
+    )
+    for row in rows:
+        reference[row.pop('kind')].append(row)
+    return reference
\ No newline at end of file
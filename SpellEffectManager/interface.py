@@ -1,33 +1,65 @@
 # ./SpellEffectManager/interface.py
 
 import streamlit as st
+from typing import Dict, List, Optional, Tuple
 from utils.state import state
-from .database import get_spell_effects, get_spell_effect_details, save_spell_effect
+from .database import get_spell_effects, get_spell_effect_details, save_spell_effect, apply_schema_migrations
 from .forms import render_spell_effect_form
+from .models import SpellEffect
 
 def render_spell_effect_editor():
     """Render the spell effect editor interface."""
     st.header("Spell Effect Editor")
+    apply_schema_migrations()
 
     col1, col2 = st.columns([1, 3])
     with col1:
         st.subheader("Spell Effects")
-        effects = get_spell_effects()
-        effect_options = {f"{e['name']} ({e['effect_type_name']}, {e['magic_school_name']})": e['id'] for e in effects}
-        effect_options["Create New"] = None
-        selected_effect = st.selectbox("Select Spell Effect", options=list(effect_options.keys()))
-        selected_id = effect_options[selected_effect]
-        if selected_id != state.get('selected_effect_id'):
-            state.set('selected_effect_id', selected_id)
+        effect_ids, effect_labels = _effect_choices()
+        selected_effect_id = st.selectbox(
+            "Select Spell Effect",
+            options=effect_ids,
+            format_func=effect_labels.__getitem__,
+            key='effect_select',
+            on_change=_on_effect_select
+        )
+        # The callback only fires on changes, so seed the initial selection once
+        state.get('selected_effect_id', selected_effect_id)
 
     with col2:
-        effect_data = get_spell_effect_details(state.get('selected_effect_id')) if state.get('selected_effect_id') else {}
-        form_data = render_spell_effect_form(effect_data)
-        if form_data:
-            success, message = save_spell_effect(form_data)
-            if success:
-                st.success(message)
-                state.set('selected_effect_id', None)
-                st.rerun()
-            else:
-                st.error(message)
\ No newline at end of file
+        _edit_form(state.get('selected_effect_id'))
+
+@st.fragment
+def _edit_form(selected_id: Optional[int]):
+    """Render the effect form; a failed submit reruns only this fragment, a save reruns the page."""
+    # Reuse the loaded details until the selection changes or a save invalidates them
+    if state.get('loaded_effect_data') is None or state.get('loaded_effect_id') != selected_id:
+        state.set('loaded_effect_data', (get_spell_effect_details(selected_id) or SpellEffect()) if selected_id else SpellEffect())
+        state.set('loaded_effect_id', selected_id)
+    form_data = render_spell_effect_form(state.get('loaded_effect_data'))
+    if form_data:
+        success, message = save_spell_effect(form_data)
+        if success:
+            st.success(message)
+            _effect_choices.clear()
+            # The wrapper editor's effect picker lists effects too; imported here to keep it lazy
+            from .spell_wrappers import get_spell_effects as get_wrapper_effects
+            get_wrapper_effects.clear()
+            state.set('loaded_effect_data', None)
+            state.set('selected_effect_id', None)
+            # The selector lives outside this fragment and must pick up the new listing
+            st.rerun()
+        else:
+            st.error(message)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _effect_choices() -> Tuple[List[Optional[int]], Dict[Optional[int], str]]:
+    """Return the selectable effect ids and their labels, rebuilt only after a save or expiry."""
+    effects = get_spell_effects()
+    labels = {e['id']: f"{e['name']} ({e['effect_type_name']}, {e['magic_school_name']})" for e in effects}
+    labels[None] = "Create New"
+    return list(labels), labels
+
+def _on_effect_select():
+    """Point the form at the effect picked in the selectbox."""
+    state.set('selected_effect_id', st.session_state.effect_select)
\ No newline at end of file
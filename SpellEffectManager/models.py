@@ -0,0 +1,42 @@
+# ./SpellEffectManager/models.py
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+@dataclass(slots=True)
+class DamageData:
+    """Damage row attached to a damage-type spell effect."""
+    range_type_id: Optional[int] = None
+    range_distance: int = 0
+    base_damage: str = ''
+    resistance_save_id: Optional[int] = None
+
+@dataclass(slots=True)
+class SpellEffect:
+    """A spell effect as loaded into and submitted from the effect editor form."""
+    id: Optional[int] = None
+    name: str = ''
+    description: str = ''
+    effect_type_id: Optional[int] = None
+    magic_school_id: Optional[int] = None
+    effect_type_name: str = ''
+    damage_data: Optional[DamageData] = None
+
+@dataclass(slots=True)
+class SpellWrapper:
+    """A spell wrapper (spell, cost and targeting) as edited in the wrapper form."""
+    id: Optional[int] = None
+    spell_name: str = ''
+    spell_description: str = ''
+    spell_id: Optional[int] = None
+    resource_id: Optional[int] = None
+    resource_name: Optional[str] = None
+    cost_amount: int = 0
+    charges_per_day: Optional[int] = None
+    casting_time: float = 0.0
+    max_range: Optional[int] = None
+    max_targets: Optional[int] = None
+    requires_los: Optional[bool] = None
+    allow_dead_targets: Optional[bool] = None
+    ignore_target_immunity: Optional[bool] = None
+    effect_ids: List[int] = field(default_factory=list)
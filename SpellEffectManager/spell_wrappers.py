@@ -2,43 +2,34 @@
 
 import streamlit as st
 import sqlite3
+import orjson
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Optional, Tuple
+from utils.database import get_db_connection, get_data_version, TRANSACTION_LOCK
+from .database import apply_schema_migrations
+from .models import SpellWrapper
 
-def get_db_connection():
-    """Create a database connection"""
-    return sqlite3.connect('rpg_data.db')
+# How long a save waits on the writer thread before the page moves on and polls it on a later rerun
+SAVE_WAIT_SECONDS = 0.5
 
-def get_spell_wrappers() -> List[Dict]:
-    """Fetch all spell wrappers with spell names and resource info"""
+def get_spell_wrappers() -> List[Tuple[int, str]]:
+    """Fetch all spell wrappers as (id, label) pairs, labelled with spell name and resource cost"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            SELECT 
-                sc.id, 
-                s.name AS spell_name, 
-                s.description AS spell_description, 
-                r.name AS resource_name, 
-                sc.cost_amount,
-                s.charges_per_day,
-                st.max_range,
-                st.max_targets
-            FROM spell_costs sc
-            JOIN spells s ON sc.spell_id = s.id
-            LEFT JOIN resources r ON sc.resource_id = r.id
-            LEFT JOIN spell_targeting st ON s.id = st.spell_id
-            ORDER BY s.name
-        """)
-        columns = ['id', 'spell_name', 'spell_description', 'resource_name', 'cost_amount', 
-                   'charges_per_day', 'max_range', 'max_targets']
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
-    except sqlite3.Error as e:
-        st.error(f"Database error fetching spell wrappers: {e}")
-        return []
-    finally:
-        conn.close()
+    cursor.execute("""
+        SELECT 
+            sc.id, 
+            s.name || ' (' || COALESCE(r.name, 'No Resource') || ', ' || COALESCE(sc.cost_amount, 'None') || ')' AS label
+        FROM spell_costs sc
+        JOIN spells s ON sc.spell_id = s.id
+        LEFT JOIN resources r ON sc.resource_id = r.id
+        ORDER BY s.name
+    """)
+    # Only the selector reads this, so plain tuples stand in for per-row dicts
+    return [tuple(row) for row in cursor]
 
-def get_spell_wrapper_details(wrapper_id: int) -> Optional[Dict]:
+@st.cache_data(ttl=60, show_spinner=False)
+def get_spell_wrapper_details(wrapper_id: int) -> Optional[SpellWrapper]:
     """Fetch details of a specific spell wrapper, including associated effects"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -56,7 +47,17 @@ def get_spell_wrapper_details(wrapper_id: int) -> Optional[Dict]:
                 st.max_targets,
                 st.requires_los,
                 st.allow_dead_targets,
-                st.ignore_target_immunity
+                st.ignore_target_immunity,
+                (
+                    SELECT json_group_array(id)
+                    FROM (
+                        SELECT se.id
+                        FROM spell_has_effects she
+                        JOIN spell_effects se ON she.spell_effect_id = se.id
+                        WHERE she.spell_id = s.id
+                        ORDER BY she.effect_order
+                    )
+                ) AS effect_ids
             FROM spell_costs sc
             JOIN spells s ON sc.spell_id = s.id
             LEFT JOIN spell_targeting st ON s.id = st.spell_id
@@ -65,217 +66,266 @@ def get_spell_wrapper_details(wrapper_id: int) -> Optional[Dict]:
         result = cursor.fetchone()
         if not result:
             return None
-        columns = ['id', 'spell_name', 'spell_description', 'spell_id', 'resource_id', 
-                   'cost_amount', 'charges_per_day', 'max_range', 'max_targets', 
-                   'requires_los', 'allow_dead_targets', 'ignore_target_immunity']
-        wrapper_data = dict(zip(columns, result))
-
-        cursor.execute("""
-            SELECT se.id, se.name
-            FROM spell_has_effects she
-            JOIN spell_effects se ON she.spell_effect_id = se.id
-            WHERE she.spell_id = ?
-            ORDER BY she.effect_order
-        """, (wrapper_data['spell_id'],))
-        effects = [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-        wrapper_data['effect_ids'] = [e['id'] for e in effects]
-        return wrapper_data
+        # Cached results must be picklable, so the row becomes a plain dataclass here;
+        # the effect ids arrive as one JSON array in effect order
+        wrapper_data = dict(result)
+        wrapper_data['effect_ids'] = orjson.loads(wrapper_data['effect_ids'])
+        return SpellWrapper(**wrapper_data)
     except sqlite3.Error as e:
         st.error(f"Database error fetching wrapper details: {e}")
         return None
-    finally:
-        conn.close()
 
-def save_spell_wrapper(data: Dict) -> Tuple[bool, str]:
-    """Save or update a spell wrapper"""
-    conn = get_db_connection()
+@st.cache_resource
+def _wrapper_writer() -> ThreadPoolExecutor:
+    """Return the single writer thread, so wrapper saves from every session run one at a time"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="spell-wrapper-writer")
+
+def save_spell_wrapper(data: SpellWrapper) -> Tuple[bool, str]:
+    """Save or update a spell wrapper on the writer thread, waiting briefly for the result"""
+    # The cached connection is resolved here; the writer thread has no Streamlit script context
+    future = _wrapper_writer().submit(_write_spell_wrapper, get_db_connection(), data)
+    try:
+        return _finish_wrapper_save(future.result(timeout=SAVE_WAIT_SECONDS))
+    except FutureTimeoutError:
+        st.session_state.pending_wrapper_save = future
+        return True, f"Saving spell wrapper '{data.spell_name}' in the background..."
+
+def _finish_wrapper_save(result: Tuple[bool, str]) -> Tuple[bool, str]:
+    """Invalidate what a completed save may have changed; runs on the script thread"""
+    if result[0]:
+        # The save may have created a spell or resource and changed this wrapper
+        get_spell_wrapper_details.clear()
+        _wrapper_choices.clear()
+        st.session_state.pop('loaded_wrapper_data', None)
+        get_spells.clear()
+        get_resources.clear()
+    return result
+
+def _write_spell_wrapper(conn: sqlite3.Connection, data: SpellWrapper) -> Tuple[bool, str]:
+    """Write a spell wrapper in one transaction; runs on the writer thread"""
     cursor = conn.cursor()
     try:
-        cursor.execute("BEGIN TRANSACTION")
+        # The connection autocommits, so the explicit BEGIN opens the transaction and
+        # the with block commits it, or rolls it back on any exception; the lock keeps
+        # script-thread transactions on the shared connection out until it is done
+        with TRANSACTION_LOCK, conn:
+            cursor.execute("BEGIN TRANSACTION")
 
-        # Ensure spell exists or create it
-        cursor.execute("SELECT id FROM spells WHERE name = ?", (data['spell_name'],))
-        spell_result = cursor.fetchone()
-        if spell_result:
-            spell_id = spell_result[0]
-            cursor.execute("""
-                UPDATE spells SET description = ?, charges_per_day = ?
-                WHERE id = ?
-            """, (data['spell_description'], data['charges_per_day'], spell_id))
-        else:
+            # Create the spell or update the existing one with this name
             cursor.execute("""
                 INSERT INTO spells (name, description, spell_tier, charges_per_day)
                 VALUES (?, ?, 1, ?)
-            """, (data['spell_name'], data['spell_description'], data['charges_per_day']))
-            spell_id = cursor.lastrowid
+                ON CONFLICT(name) DO UPDATE SET
+                    description = excluded.description,
+                    charges_per_day = excluded.charges_per_day
+                RETURNING id
+            """, (data.spell_name, data.spell_description, data.charges_per_day))
+            spell_id = cursor.fetchone()[0]
 
-        # Handle resource (optional)
-        resource_id = None
-        if data.get('resource_name'):
-            cursor.execute("SELECT id FROM resources WHERE name = ?", (data['resource_name'],))
-            resource_result = cursor.fetchone()
-            if resource_result:
-                resource_id = resource_result[0]
-            else:
+            # Handle resource (optional); an existing resource is reused unchanged
+            resource_id = None
+            if data.resource_name:
                 cursor.execute("""
                     INSERT INTO resources (name, description)
-                    VALUES (?, ?)
-                """, (data['resource_name'], ''))
-                resource_id = cursor.lastrowid
-        elif data.get('resource_id') is not None:
-            resource_id = data['resource_id']
-
-        # Save or update spell_costs
-        if data.get('id'):
-            cursor.execute("""
-                UPDATE spell_costs
-                SET spell_id = ?, resource_id = ?, cost_amount = ?
-                WHERE id = ?
-            """, (spell_id, resource_id, data['cost_amount'], data['id']))
-            wrapper_id = data['id']
-        else:
-            cursor.execute("""
-                INSERT INTO spell_costs (spell_id, resource_id, cost_amount)
-                VALUES (?, ?, ?)
-            """, (spell_id, resource_id, data['cost_amount']))
-            wrapper_id = cursor.lastrowid
+                    VALUES (?, '')
+                    ON CONFLICT(name) DO UPDATE SET name = excluded.name
+                    RETURNING id
+                """, (data.resource_name,))
+                resource_id = cursor.fetchone()[0]
+            elif data.resource_id is not None:
+                resource_id = data.resource_id
 
-        # Update spell_has_effects
-        cursor.execute("DELETE FROM spell_has_effects WHERE spell_id = ?", (spell_id,))
-        if data.get('effect_ids'):
-            for order, effect_id in enumerate(data['effect_ids'], 1):
+            # Save or update spell_costs
+            if data.id:
                 cursor.execute("""
-                    INSERT INTO spell_has_effects (spell_id, spell_effect_id, effect_order)
+                    UPDATE spell_costs
+                    SET spell_id = ?, resource_id = ?, cost_amount = ?
+                    WHERE id = ?
+                """, (spell_id, resource_id, data.cost_amount, data.id))
+                wrapper_id = data.id
+            else:
+                cursor.execute("""
+                    INSERT INTO spell_costs (spell_id, resource_id, cost_amount)
                     VALUES (?, ?, ?)
-                """, (spell_id, effect_id, order))
+                """, (spell_id, resource_id, data.cost_amount))
+                wrapper_id = cursor.lastrowid
 
-        # Update spell_targeting
-        cursor.execute("DELETE FROM spell_targeting WHERE spell_id = ?", (spell_id,))
-        cursor.execute("""
-            INSERT INTO spell_targeting (spell_id, max_targets, requires_los, allow_dead_targets, 
-                                       ignore_target_immunity, max_range)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (spell_id, data['max_targets'], data['requires_los'], data['allow_dead_targets'], 
-              data['ignore_target_immunity'], data['max_range']))
+            # Update spell_has_effects, touching only links that were removed, added or reordered
+            cursor.execute("SELECT spell_effect_id, effect_order FROM spell_has_effects WHERE spell_id = ?", (spell_id,))
+            current_orders = dict(cursor)
+            cursor.executemany(
+                "DELETE FROM spell_has_effects WHERE spell_id = ? AND spell_effect_id = ?",
+                [(spell_id, effect_id) for effect_id in current_orders.keys() - set(data.effect_ids)]
+            )
+            cursor.executemany("""
+                INSERT INTO spell_has_effects (spell_id, spell_effect_id, effect_order)
+                VALUES (?, ?, ?)
+                ON CONFLICT(spell_id, spell_effect_id) DO UPDATE SET effect_order = excluded.effect_order
+            """, [(spell_id, effect_id, order) for order, effect_id in enumerate(data.effect_ids, 1)
+                  if current_orders.get(effect_id) != order])
+
+            # Create or update spell_targeting; one row per spell via idx_spell_targeting_spell
+            cursor.execute("""
+                INSERT INTO spell_targeting (spell_id, max_targets, requires_los, allow_dead_targets, 
+                                           ignore_target_immunity, max_range)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(spell_id) DO UPDATE SET
+                    max_targets = excluded.max_targets,
+                    requires_los = excluded.requires_los,
+                    allow_dead_targets = excluded.allow_dead_targets,
+                    ignore_target_immunity = excluded.ignore_target_immunity,
+                    max_range = excluded.max_range
+            """, (spell_id, data.max_targets, data.requires_los, data.allow_dead_targets, 
+                  data.ignore_target_immunity, data.max_range))
 
-        conn.commit()
-        return True, f"Spell Wrapper {'updated' if data.get('id') else 'created'} successfully!"
+        return True, f"Spell Wrapper {'updated' if data.id else 'created'} successfully!"
     except sqlite3.Error as e:
-        conn.rollback()
         return False, f"Error saving spell wrapper: {str(e)}"
-    finally:
-        conn.close()
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_spells() -> List[Dict]:
     """Fetch available spells"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id, name FROM spells ORDER BY name")
-        return [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    cursor.execute("SELECT id, name FROM spells ORDER BY name")
+    return [dict(row) for row in cursor]
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_resources() -> List[Dict]:
     """Fetch available resources"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id, name FROM resources ORDER BY name")
-        return [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    cursor.execute("SELECT id, name FROM resources ORDER BY name")
+    return [dict(row) for row in cursor]
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_spell_effects() -> List[Dict]:
     """Fetch available spell effects"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id, name FROM spell_effects ORDER BY name")
-        return [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    cursor.execute("SELECT id, name FROM spell_effects ORDER BY name")
+    return [dict(row) for row in cursor]
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _wrapper_choices(data_version: int) -> Tuple[List[Optional[int]], Dict[Optional[int], str]]:
+    """Return the selectable wrapper ids and their labels, rebuilt after a save here or a commit elsewhere"""
+    labels = dict(get_spell_wrappers())
+    labels[None] = "Create New"
+    return list(labels), labels
+
+def _on_wrapper_select():
+    """Point the form at the wrapper picked in the selectbox"""
+    st.session_state.selected_wrapper_id = st.session_state.wrapper_select
 
 def render_spell_wrappers():
     """Render the spell wrappers editor"""
     st.header("Spell Wrappers Editor")
+    apply_schema_migrations()
+
+    # Report a save that outlasted SAVE_WAIT_SECONDS once the writer thread has finished it
+    pending_save = st.session_state.get('pending_wrapper_save')
+    if pending_save is not None:
+        if pending_save.done():
+            del st.session_state.pending_wrapper_save
+            success, message = _finish_wrapper_save(pending_save.result())
+            (st.success if success else st.error)(message)
+        else:
+            st.info("A spell wrapper save is still in progress.")
     col1, col2 = st.columns([1, 2])
 
     with col1:
         st.subheader("Spell Wrappers")
-        wrappers = get_spell_wrappers()
-        if not wrappers:
+        try:
+            # data_version only moves for other connections' commits; saves here clear the cache
+            wrapper_ids, wrapper_labels = _wrapper_choices(get_data_version())
+        except sqlite3.Error as e:
+            # Raised rather than returned, so a failed listing is never cached
+            st.error(f"Database error fetching spell wrappers: {e}")
+            wrapper_ids, wrapper_labels = [None], {None: "Create New"}
+        if len(wrapper_ids) == 1:
             st.info("No spell wrappers found yet. Use the form to create one.")
-        wrapper_options = {f"{w['spell_name']} ({w['resource_name'] or 'No Resource'}, {w['cost_amount']})": w['id'] for w in wrappers}
-        wrapper_options["Create New"] = None
-        selected_wrapper = st.selectbox("Select Spell Wrapper", options=list(wrapper_options.keys()))
-        if selected_wrapper != st.session_state.get('last_selected_wrapper', ''):
-            st.session_state.selected_wrapper_id = wrapper_options[selected_wrapper]
-            st.session_state.last_selected_wrapper = selected_wrapper
+        selected_wrapper_id = st.selectbox(
+            "Select Spell Wrapper",
+            options=wrapper_ids,
+            format_func=wrapper_labels.__getitem__,
+            key='wrapper_select',
+            on_change=_on_wrapper_select
+        )
+        # The callback only fires on changes, so seed the initial selection once
+        st.session_state.setdefault('selected_wrapper_id', selected_wrapper_id)
 
     with col2:
-        wrapper_data = get_spell_wrapper_details(st.session_state.get('selected_wrapper_id')) if st.session_state.get('selected_wrapper_id') else {}
+        # Reuse the loaded details until the selection changes or a save invalidates them
+        selected_wrapper_id = st.session_state.get('selected_wrapper_id')
+        if 'loaded_wrapper_data' not in st.session_state or st.session_state.get('loaded_wrapper_id') != selected_wrapper_id:
+            st.session_state.loaded_wrapper_data = (get_spell_wrapper_details(selected_wrapper_id) or SpellWrapper()) if selected_wrapper_id else SpellWrapper()
+            st.session_state.loaded_wrapper_id = selected_wrapper_id
+        wrapper_data = st.session_state.loaded_wrapper_data
         
         with st.form("spell_wrapper_form"):
             spell_name = st.text_input("Spell Name", 
-                                     value=wrapper_data.get('spell_name', ''),
+                                     value=wrapper_data.spell_name,
                                      help="Enter the name of the spell (required).")
             spell_description = st.text_area("Spell Description (optional)", 
-                                           value=wrapper_data.get('spell_description', ''))
+                                           value=wrapper_data.spell_description)
 
             # Casting Time
             casting_time = st.number_input("Casting Time (seconds)", 
                                          min_value=0.0, step=0.1, 
-                                         value=float(wrapper_data.get('casting_time', 0.0)) if wrapper_data.get('casting_time') is not None else 0.0)
+                                         value=float(wrapper_data.casting_time))
 
             # Resources (optional)
             resources = get_resources()
             if resources:
-                resource_options = [{'id': None, 'name': 'None'}] + resources
+                # id -> name and id -> position maps keep format_func and index lookups O(1)
+                resources_by_id = {None: 'None', **{r['id']: r['name'] for r in resources}}
+                resource_index = {r_id: i for i, r_id in enumerate(resources_by_id)}
                 resource_id = st.selectbox(
                     "Resource Cost Type (optional)",
-                    options=[r['id'] for r in resource_options],
-                    format_func=lambda x: next(r['name'] for r in resource_options if r['id'] == x),
-                    index=next((i for i, r in enumerate(resource_options) if r['id'] == wrapper_data.get('resource_id')), 0) if wrapper_data.get('resource_id') is not None else 0
+                    options=list(resources_by_id),
+                    format_func=lambda x, m=resources_by_id: m.get(x, ''),
+                    index=resource_index.get(wrapper_data.resource_id, 0)
                 )
-                resource_name = None if resource_id is None else next(r['name'] for r in resources if r['id'] == resource_id)
+                resource_name = None if resource_id is None else resources_by_id[resource_id]
             else:
+                resource_id = None
                 st.info("No resources found. Optionally enter a new resource name or leave blank.")
                 resource_name = st.text_input("New Resource Name (optional)", 
-                                            value=wrapper_data.get('resource_name', '') if wrapper_data.get('resource_name') else '')
+                                            value=wrapper_data.resource_name or '')
 
             cost_amount = st.number_input("Cost Amount", 
                                         min_value=0, 
-                                        value=wrapper_data.get('cost_amount', 0))
+                                        value=wrapper_data.cost_amount)
 
             # Charges Per Day
             charges_per_day = st.number_input("Charges Per Day (optional, 0 for unlimited)", 
                                             min_value=0, 
-                                            value=wrapper_data.get('charges_per_day', 0) if wrapper_data.get('charges_per_day') is not None else 0)
+                                            value=wrapper_data.charges_per_day if wrapper_data.charges_per_day is not None else 0)
 
             # Targeting Details
             st.subheader("Targeting")
             max_range = st.number_input("Max Range (meters)", 
                                       min_value=0, 
-                                      value=wrapper_data.get('max_range', 0) if wrapper_data.get('max_range') is not None else 0)
+                                      value=wrapper_data.max_range if wrapper_data.max_range is not None else 0)
             max_targets = st.number_input("Max Targets", 
                                         min_value=1, 
-                                        value=wrapper_data.get('max_targets', 1) if wrapper_data.get('max_targets') is not None else 1)
+                                        value=wrapper_data.max_targets if wrapper_data.max_targets is not None else 1)
             requires_los = st.checkbox("Requires Line of Sight", 
-                                     value=wrapper_data.get('requires_los', True) if wrapper_data.get('requires_los') is not None else True)
+                                     value=wrapper_data.requires_los if wrapper_data.requires_los is not None else True)
             allow_dead_targets = st.checkbox("Allow Dead Targets", 
-                                           value=wrapper_data.get('allow_dead_targets', False) if wrapper_data.get('allow_dead_targets') is not None else False)
+                                           value=bool(wrapper_data.allow_dead_targets))
             ignore_target_immunity = st.checkbox("Ignore Target Immunity", 
-                                               value=wrapper_data.get('ignore_target_immunity', False) if wrapper_data.get('ignore_target_immunity') is not None else False)
+                                               value=bool(wrapper_data.ignore_target_immunity))
 
             # Spell Effects
             effects = get_spell_effects()
             if effects:
+                effects_by_id = {e['id']: e['name'] for e in effects}
                 effect_ids = st.multiselect(
                     "Spell Effects",
-                    options=[e['id'] for e in effects],
-                    format_func=lambda x: next(e['name'] for e in effects if e['id'] == x),
-                    default=wrapper_data.get('effect_ids', []),
+                    options=list(effects_by_id),
+                    format_func=lambda x, m=effects_by_id: m.get(x, ''),
+                    default=wrapper_data.effect_ids,
                     help="Select one or more effects this spell will trigger."
                 )
             else:
@@ -289,23 +339,22 @@ def render_spell_wrappers():
                 else:
                     if resource_name == '':
                         resource_name = None
-                    data = {
-                        'id': wrapper_data.get('id'),
-                        'spell_name': spell_name,
-                        'spell_description': spell_description,
-                        'resource_name': resource_name,
-                        'cost_amount': cost_amount,
-                        'charges_per_day': charges_per_day if charges_per_day > 0 else None,
-                        'casting_time': casting_time,
-                        'max_range': max_range,
-                        'max_targets': max_targets,
-                        'requires_los': requires_los,
-                        'allow_dead_targets': allow_dead_targets,
-                        'ignore_target_immunity': ignore_target_immunity,
-                        'effect_ids': effect_ids
-                    }
-                    if resources and resource_id is not None:
-                        data['resource_id'] = resource_id
+                    data = SpellWrapper(
+                        id=wrapper_data.id,
+                        spell_name=spell_name,
+                        spell_description=spell_description,
+                        resource_id=resource_id,
+                        resource_name=resource_name,
+                        cost_amount=cost_amount,
+                        charges_per_day=charges_per_day if charges_per_day > 0 else None,
+                        casting_time=casting_time,
+                        max_range=max_range,
+                        max_targets=max_targets,
+                        requires_los=requires_los,
+                        allow_dead_targets=allow_dead_targets,
+                        ignore_target_immunity=ignore_target_immunity,
+                        effect_ids=effect_ids
+                    )
                     success, message = save_spell_wrapper(data)
                     if success:
                         st.success(message)
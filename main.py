@@ -15,8 +15,7 @@ from ClassManager.JobClassEditor.classesTable import render_job_table
 from ServerMessage import render_server_tab
 from LocationManager import render_location_editor_tab
 from DatabaseInspector import render_db_inspector_tab
-from SpellEffectManager import render_spell_effect_editor
-from SpellEffectManager.spell_wrappers import render_spell_wrappers
+from SpellEffectManager import render_spell_effect_editor, render_spell_wrappers
 
 # Set page config as the first Streamlit command
 st.set_page_config(page_title="RPG Character Management", layout="wide")
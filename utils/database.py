@@ -1,37 +1,75 @@
 # ./utils/database.py
 
 import sqlite3
+import threading
+import streamlit as st
 from pathlib import Path
 
+# Parsed statements kept per connection, keyed by SQL text; every query here is a
+# constant string, so repeat calls reuse the compiled statement instead of re-parsing
+STATEMENT_CACHE_SIZE = 256
+
+# Applied once to the shared connection: in WAL mode a commit appends to rpg_data.db-wal
+# instead of rewriting a rollback journal, and synchronous=NORMAL skips the per-commit
+# fsync while staying durable; the git tab checkpoints the WAL back before pulling
+CONNECTION_PRAGMAS = (
+    "foreign_keys = ON",
+    "synchronous = NORMAL",
+    "temp_store = MEMORY",
+    "cache_size = -20000",
+    "mmap_size = 268435456",
+)
+
+# Held around every transaction on the shared connection; a BEGIN from another thread
+# would otherwise end a transaction already open on it and leave the rest to autocommit
+TRANSACTION_LOCK = threading.Lock()
+
+@st.cache_resource
 def get_db_connection():
-    """Create a database connection to rpg_data.db."""
+    """Return the shared connection to rpg_data.db, opened once per process."""
     db_path = Path("rpg_data.db")
     if not db_path.exists():
         raise FileNotFoundError("Database file not found at rpg_data.db")
-    return sqlite3.connect(db_path)
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if journal_mode.lower() != "wal":
+        st.warning(f"SQLite kept journal mode '{journal_mode}'; WAL could not be enabled for rpg_data.db")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def get_data_version() -> int:
+    """Return SQLite's data_version, which changes whenever another connection commits."""
+    return get_db_connection().execute("PRAGMA data_version").fetchone()[0]
 
 def fetch_all(query: str, params: tuple = ()) -> list:
     """Execute a SELECT query and return all results."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        columns = [desc[0] for desc in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    cursor = get_db_connection().execute(query, params)
+    return [dict(row) for row in cursor]
 
 def execute_transaction(query: str, params: tuple = ()) -> int:
     """Execute an INSERT/UPDATE/DELETE query with transaction support."""
     conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("BEGIN TRANSACTION")
+    # The connection autocommits, so BEGIN opens the transaction; the with block
+    # commits it, or rolls it back on any exception
+    with TRANSACTION_LOCK, conn:
+        cursor = conn.execute("BEGIN TRANSACTION")
         cursor.execute(query, params)
-        conn.commit()
         return cursor.lastrowid if "INSERT" in query.upper() else cursor.rowcount
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
\ No newline at end of file
+
+def execute_many_transaction(statements: list) -> list:
+    """Execute several (query, params) statements in one transaction, returning each lastrowid."""
+    conn = get_db_connection()
+    with TRANSACTION_LOCK, conn:
+        cursor = conn.execute("BEGIN TRANSACTION")
+        row_ids = []
+        for query, params in statements:
+            cursor.execute(query, params)
+            row_ids.append(cursor.lastrowid)
+        return row_ids
\ No newline at end of file
@@ -7,11 +7,13 @@ def render_dropdown(label: str, items: List[Dict], key: str, value_key: str = 'i
     """Render a customizable dropdown from a list of dictionaries."""
     if not items:
         return None
-    index = next((i for i, item in enumerate(items) if item[value_key] == default_value), 0)
+    # value -> label dict, so format_func is a lookup rather than a scan per rendered option
+    labels = {item[value_key]: item[display_key] for item in items}
+    options = list(labels)
     return st.selectbox(
         label,
-        options=[item[value_key] for item in items],
-        format_func=lambda x: next(item[display_key] for item in items if item[value_key] == x),
-        index=index,
+        options=options,
+        format_func=labels.__getitem__,
+        index=options.index(default_value) if default_value in labels else 0,
         key=key
     )
\ No newline at end of file